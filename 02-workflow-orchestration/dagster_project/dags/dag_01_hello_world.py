@@ -3,7 +3,7 @@
 # This file is a minimal Dagster walkthrough.
 # It demonstrates: op dependencies, logging, scheduling, and a simple run lifecycle.
 
-from dagster import op, job, schedule
+from dagster import op, job, schedule, Field
 from datetime import datetime
 
 
@@ -24,14 +24,17 @@ def generate_output(context, greeting: str):
     return {"value": "I was generated during this workflow.", "greeting": greeting}
 
 
-@op
+@op(config_schema={"sleep_seconds": Field(int, default_value=0)})
 def sleep_task(context, generated_output: dict):
-    """Step 3: simulate a slow task and pass previous output through."""
+    """Step 3: optionally simulate a slow task and pass previous output through."""
     import time
-    # This intentionally creates a visible delay so you can inspect timing in the UI timeline.
-    context.log.info("Starting sleep for 15 seconds...")
-    time.sleep(15)
-    context.log.info("Sleep complete!")
+    # Defaults to no delay so scheduled/CI runs don't hold a worker slot; set sleep_seconds
+    # in run config (e.g. 15) to get a visible gap when inspecting the UI timeline.
+    sleep_seconds = context.op_config["sleep_seconds"]
+    if sleep_seconds > 0:
+        context.log.info(f"Starting sleep for {sleep_seconds} seconds...")
+        time.sleep(sleep_seconds)
+        context.log.info("Sleep complete!")
     return generated_output
 
 
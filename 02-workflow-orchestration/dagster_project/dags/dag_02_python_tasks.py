@@ -3,9 +3,30 @@
 # This file demonstrates a classic orchestration pattern:
 # call an external API, validate response, log key metrics, and fail clearly on errors.
 
-import requests
+from functools import lru_cache
+
 from dagster import op, job, Failure
 
+# (connect, read) timeout in seconds so a network stall fails the run instead of hanging it.
+REQUEST_TIMEOUT = (3, 10)
+
+
+@lru_cache(maxsize=None)
+def _get_session():
+    """Build the shared HTTP session on first use so importing this module stays cheap."""
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util import Retry
+
+    # One shared session keeps the TLS connection alive between calls, and the retry
+    # adapter absorbs transient GitHub errors (rate limits, 5xx) with a short backoff.
+    session = requests.Session()
+    session.mount(
+        "https://",
+        HTTPAdapter(max_retries=Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504])),
+    )
+    return session
+
 
 @op
 def collect_stats(context):
@@ -23,7 +44,7 @@ def collect_stats(context):
         """Query GitHub API and return key metadata for a public repository."""
         # Keep this helper local to the op so the example remains self-contained.
         url = f"https://api.github.com/repos/{repo_name}"
-        response = requests.get(url)
+        response = _get_session().get(url, timeout=REQUEST_TIMEOUT)
         response.raise_for_status()
         return response.json()
     
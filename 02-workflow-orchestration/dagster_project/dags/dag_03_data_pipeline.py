@@ -3,7 +3,7 @@
 # This file is a simple ETL skeleton to teach data-flow between steps.
 # It uses placeholder data but mirrors real pipeline phases: extract, validate, transform, load.
 
-from dagster import op, job, Out, DynamicOut, DynamicOutput
+from dagster import op, job, Out, DynamicOut, DynamicOutput, in_process_executor, mem_io_manager
 
 
 @op
@@ -20,8 +20,7 @@ def extract_data(context):
     return sample_data
 
 
-@op
-def validate_data(context, data):
+def _validate(context, data):
     """Validate extracted data for quality and completeness."""
     context.log.info(f"Validating {data['rows']} rows...")
     
@@ -40,8 +39,7 @@ def validate_data(context, data):
         raise Exception("Data quality below threshold")
 
 
-@op
-def transform_data(context, validation_results):
+def _transform(context, validation_results):
     """Transform and enrich the data."""
     context.log.info(f"Transforming {validation_results['valid_rows']} valid rows...")
     
@@ -53,13 +51,21 @@ def transform_data(context, validation_results):
             'type_conversion',
             'deduplication'
         ],
-        'status': 'transformed'
+        'status': 'transformed',
+        'validation': validation_results,
     }
     
     context.log.info(f"Transformation complete: {transformed}")
     return transformed
 
 
+@op
+def etl_core(context, data):
+    """Validate and transform extracted data in a single step."""
+    # Both phases are cheap dict work, so one op avoids a separate step launch and output handoff for each.
+    return _transform(context, _validate(context, data))
+
+
 @op
 def load_data(context, transformed_data):
     """Load transformed data to destination."""
@@ -77,11 +83,11 @@ def load_data(context, transformed_data):
     return load_result
 
 
-@job
+# Outputs are small dicts, so keep them in memory and run every step in one process.
+@job(executor_def=in_process_executor, resource_defs={"io_manager": mem_io_manager})
 def data_pipeline_job():
-    """ETL pipeline: Extract → Validate → Transform → Load."""
+    """ETL pipeline: Extract → Validate + Transform → Load."""
     # Explicit variable chaining makes dependencies and execution order easy to follow.
     data = extract_data()
-    validated = validate_data(data)
-    transformed = transform_data(validated)
+    transformed = etl_core(data)
     load_data(transformed)
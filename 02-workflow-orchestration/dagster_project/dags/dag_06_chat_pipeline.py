@@ -3,16 +3,51 @@
 # This file demonstrates how a data engineer can orchestrate RAG-like stages in Dagster
 # without relying on external model APIs: ingest, chunk, index, retrieve, answer, evaluate, persist.
 
+import hashlib
 import json
 import os
 import re
-from datetime import datetime
+import string
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
 
-import requests
-from dagster import job, op
+from dagster import job, multiprocess_executor, op
 
+try:
+    # Optional: faster JSON serialization for artifacts; falls back to the stdlib json module.
+    import orjson
+except ImportError:
+    orjson = None
+
+
+_TOKEN_CHARS = frozenset(string.ascii_lowercase + string.digits + "_")
+# str.translate table keeping [a-z0-9_] and mapping every other ASCII codepoint to a space.
+_ASCII_TOKEN_TABLE = {
+    codepoint: codepoint if chr(codepoint) in _TOKEN_CHARS else ord(" ") for codepoint in range(128)
+}
+# Non-ASCII text takes the regex: one such character sends str.translate through its slow per-character path.
+_TOKEN_PATTERN = re.compile(r"[a-zA-Z0-9_]+")
+
+# Characters of chunk text quoted per answer bullet: grounded answers quote more than batch session summaries.
+SNIPPET_WIDTHS = {"grounded": 140, "session": 100}
+
+# Width of the hashed token vectors used by the optional FAISS backend (RAG_INDEX_BACKEND=faiss).
+_HASH_DIM = 1024
+# Graph degree (M) of the HNSW index built by the FAISS backend.
+_HNSW_NEIGHBORS = 32
+
+# Instance-wide op concurrency keys for ops that hit shared resources (source fetch, index/embedding
+# build). Limits are set per Dagster instance, e.g. `dagster instance concurrency set embedding 1`,
+# and span all runs; the instance storage must support them (Postgres/MySQL, not the default SQLite).
+SOURCE_FETCH_CONCURRENCY_KEY = "rag_source_fetch"
+EMBEDDING_CONCURRENCY_KEY = "embedding"
+
+# RAG jobs run independent branches (ingest/index vs. query building) in parallel processes.
+RAG_EXECUTOR = multiprocess_executor.configured({"max_concurrent": int(os.getenv("RAG_MAX_CONCURRENT", "4"))})
 
 DEFAULT_QUERY = "Which features were released in Kestra 1.1? List at least 5 major features."
 
@@ -39,26 +74,27 @@ DEFAULT_DOCS = [
 ]
 
 
-def _tokenize(text: str) -> List[str]:
+def _tokenize(text: str) -> Tuple[str, ...]:
     # Normalize text into simple tokens for deterministic lexical scoring.
-    return re.findall(r"[a-zA-Z0-9_]+", text.lower())
+    # On ASCII text, translate + split walks the string once in C and yields the same tokens as the regex.
+    text = text.lower()
+    if text.isascii():
+        return tuple(text.translate(_ASCII_TOKEN_TABLE).split())
+    return tuple(_TOKEN_PATTERN.findall(text))
 
 
-def _chunk_text(text: str, chunk_size: int = 50, overlap: int = 10) -> List[str]:
+def _chunk_text(text: str, chunk_size: int = 50, overlap: int = 10) -> Iterator[Tuple[str, Tuple[str, ...]]]:
     # Sliding-window chunking approximates real embedding chunk preparation.
+    # Yields (chunk_text, window_tokens): the window is already tokenized, so chunks are never re-tokenized.
     tokens = _tokenize(text)
-    if not tokens:
-        return []
-    chunks: List[str] = []
     step = max(1, chunk_size - overlap)
     for start in range(0, len(tokens), step):
         chunk = tokens[start : start + chunk_size]
         if not chunk:
             continue
-        chunks.append(" ".join(chunk))
+        yield " ".join(chunk), chunk
         if start + chunk_size >= len(tokens):
             break
-    return chunks
 
 
 def _artifact_dir(context) -> Path:
@@ -73,12 +109,56 @@ def _artifact_dir(context) -> Path:
 def _write_json(context, name: str, payload: Dict[str, Any]) -> str:
     # Persist operational artifacts so results can be inspected outside Dagster logs.
     destination = _artifact_dir(context) / f"{name}.json"
+    if orjson is not None:
+        destination.write_bytes(orjson.dumps(payload, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+        return str(destination)
     with open(destination, "w", encoding="utf-8") as output_file:
         json.dump(payload, output_file, indent=2)
     return str(destination)
 
 
-@op
+@lru_cache(maxsize=None)
+def _get_http_session():
+    # One keep-alive session per process; requests is imported here so code-location loads skip it.
+    import requests
+
+    return requests.Session()
+
+
+def _fetch_with_validators(url: str, timeout: int = 20) -> Tuple[str, bool]:
+    """Fetch url with a conditional GET, returning (body, served_from_cache)."""
+    # The last body and its ETag/Last-Modified validators are kept on disk, so an unchanged source
+    # costs a 304 response instead of a full download on every scheduled run.
+    cache_dir = Path(os.getenv("RAG_HTTP_CACHE", "/tmp/rag_http_cache"))
+    cache_key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+    body_path = cache_dir / f"{cache_key}.body"
+    validators_path = cache_dir / f"{cache_key}.json"
+
+    headers = {}
+    if body_path.exists() and validators_path.exists():
+        validators = json.loads(validators_path.read_text(encoding="utf-8"))
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+
+    response = _get_http_session().get(url, headers=headers, timeout=timeout)
+    if response.status_code == 304 and headers:
+        return body_path.read_text(encoding="utf-8"), True
+    response.raise_for_status()
+
+    validators = {
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+    }
+    if validators["etag"] or validators["last_modified"]:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        body_path.write_text(response.text, encoding="utf-8")
+        validators_path.write_text(json.dumps(validators), encoding="utf-8")
+    return response.text, False
+
+
+@op(tags={"dagster/concurrency_key": SOURCE_FETCH_CONCURRENCY_KEY})
 def ingest_documents(context) -> List[Dict[str, str]]:
     """Ingest docs from embedded defaults and optional external URL (no API key required)."""
     documents = list(DEFAULT_DOCS)
@@ -88,16 +168,17 @@ def ingest_documents(context) -> List[Dict[str, str]]:
     if external_url:
         context.log.info(f"Attempting external ingestion from {external_url}")
         try:
-            response = requests.get(external_url, timeout=20)
-            response.raise_for_status()
+            content, from_cache = _fetch_with_validators(external_url)
             documents.append(
                 {
                     "id": "external_source",
                     "title": "External Source Document",
                     "source": external_url,
-                    "content": response.text,
+                    "content": content,
                 }
             )
+            if from_cache:
+                context.log.info("External source unchanged (304); reused cached copy")
             context.log.info("External source ingested successfully")
         except Exception as error:
             context.log.warning(f"External ingestion failed; continuing with embedded docs. Reason: {error}")
@@ -106,51 +187,74 @@ def ingest_documents(context) -> List[Dict[str, str]]:
     return documents
 
 
-@op
-def chunk_documents(context, documents: List[Dict[str, str]]) -> Dict[str, Any]:
-    """Chunk documents and produce ingestion metrics."""
-    chunks: List[Dict[str, Any]] = []
-    # Build chunk records that carry provenance (doc_id/title) for later citation.
+def _iter_chunk_records(documents: List[Dict[str, str]]) -> Iterator[Dict[str, Any]]:
+    # Build chunk records that carry provenance (doc_id/title) for later citation, one at a time.
     for document in documents:
-        for index, chunk in enumerate(_chunk_text(document["content"])):
-            chunks.append(
-                {
-                    "chunk_id": f"{document['id']}_chunk_{index:03d}",
-                    "doc_id": document["id"],
-                    "title": document["title"],
-                    "text": chunk,
-                    "token_count": len(_tokenize(chunk)),
-                }
-            )
+        for index, (chunk, chunk_tokens) in enumerate(_chunk_text(document["content"])):
+            yield {
+                "chunk_id": f"{document['id']}_chunk_{index:03d}",
+                "doc_id": document["id"],
+                "title": document["title"],
+                "text": chunk,
+                "tokens": chunk_tokens,
+                "token_count": len(chunk_tokens),
+            }
 
-    average_tokens = sum(chunk["token_count"] for chunk in chunks) / max(1, len(chunks))
-    metrics = {
+
+@op(tags={"dagster/concurrency_key": EMBEDDING_CONCURRENCY_KEY})
+def chunk_and_index(context, documents: List[Dict[str, str]]) -> Dict[str, Any]:
+    """Chunk documents and build a deterministic lexical index (stand-in for vector DB) in one pass."""
+    # One timestamp per op run, shared by the chunk and index metrics.
+    now = datetime.now(timezone.utc).isoformat()
+    chunk_stats = {"chunk_count": 0, "token_total": 0}
+
+    def counted_chunks() -> Iterator[Dict[str, Any]]:
+        # Ingestion metrics accumulate as each chunk streams into the index.
+        for chunk in _iter_chunk_records(documents):
+            chunk_stats["chunk_count"] += 1
+            chunk_stats["token_total"] += chunk["token_count"]
+            yield chunk
+
+    # Chunks go straight into the index, so no chunk list is materialized or handed to another step.
+    index_payload = _index_chunks(context, counted_chunks(), now)
+    chunk_metrics = {
         "document_count": len(documents),
-        "chunk_count": len(chunks),
-        "avg_chunk_tokens": round(average_tokens, 2),
-        "timestamp": datetime.utcnow().isoformat(),
+        "chunk_count": chunk_stats["chunk_count"],
+        "avg_chunk_tokens": round(chunk_stats["token_total"] / max(1, chunk_stats["chunk_count"]), 2),
+        "timestamp": now,
     }
-    context.log.info(f"Chunking metrics: {metrics}")
-    return {"chunks": chunks, "metrics": metrics}
+    context.log.info(f"Chunking metrics: {chunk_metrics}")
+    index_payload["chunk_metrics"] = chunk_metrics
+    return index_payload
 
 
-@op
-def build_mock_index(context, chunk_payload: Dict[str, Any]) -> Dict[str, Any]:
-    """Build a deterministic lexical index (stand-in for vector DB)."""
+def _index_chunks(context, chunks: Iterable[Dict[str, Any]], timestamp: str) -> Dict[str, Any]:
+    # Consumes chunks in a single pass, so a chunk generator can be indexed without materializing it first.
     entries = []
     vocabulary = set()
+    # Inverted index: token -> positions of entries containing it, so scoring only visits matching entries.
+    postings: Dict[str, List[int]] = {}
 
     # Lexical index here stands in for a vector index and remains fully deterministic.
-    for chunk in chunk_payload["chunks"]:
-        token_list = _tokenize(chunk["text"])
-        vocabulary.update(token_list)
+    for position, chunk in enumerate(chunks):
+        # Chunk records carry their window tokens, so indexing needs no regex pass of its own.
+        token_set = frozenset(chunk["tokens"])
+        vocabulary.update(token_set)
+        for token in token_set:
+            postings.setdefault(token, []).append(position)
         entries.append(
             {
                 "chunk_id": chunk["chunk_id"],
                 "doc_id": chunk["doc_id"],
                 "title": chunk["title"],
                 "text": chunk["text"],
-                "tokens": sorted(set(token_list)),
+                # Stored as a frozenset so retrieval scores against it directly instead of rebuilding a set per query.
+                "token_set": token_set,
+                # Answer bullets are formatted once here; answers just join the ones that were retrieved.
+                "display_snippets": {
+                    name: f"- [{chunk['chunk_id']}] {chunk['text'][:width]}..."
+                    for name, width in SNIPPET_WIDTHS.items()
+                },
             }
         )
 
@@ -158,10 +262,146 @@ def build_mock_index(context, chunk_payload: Dict[str, Any]) -> Dict[str, Any]:
         "indexed_chunks": len(entries),
         "vocabulary_size": len(vocabulary),
         "index_type": "lexical_mock_index",
-        "timestamp": datetime.utcnow().isoformat(),
+        "timestamp": timestamp,
     }
+
+    # NumPy is imported on first use so loading the code location stays cheap (it comes with pandas).
+    import numpy as np
+
+    # Array-backed postings and entry sizes let retrieval score every entry with vectorized ops.
+    index_payload = {
+        "entries": entries,
+        "postings": {token: np.asarray(positions, dtype=np.int32) for token, positions in postings.items()},
+        "entry_sizes": np.fromiter((len(entry["token_set"]) for entry in entries), dtype=np.int32, count=len(entries)),
+        "index_metrics": metrics,
+    }
+
+    # Optional vector backend: an HNSW graph answers top-k queries without scanning every entry.
+    if os.getenv("RAG_INDEX_BACKEND", "lexical").strip().lower() == "faiss":
+        faiss = _load_faiss()
+        if faiss is None:
+            context.log.warning("RAG_INDEX_BACKEND=faiss but faiss is not installed; using the lexical index")
+        else:
+            index_path = _faiss_index_path(entries)
+            if index_path.exists():
+                # Same corpus as an earlier run: reuse its graph instead of rebuilding it.
+                vector_index = faiss.read_index(str(index_path))
+            else:
+                vector_index = faiss.IndexHNSWFlat(_HASH_DIM, _HNSW_NEIGHBORS, faiss.METRIC_INNER_PRODUCT)
+                vector_index.add(_hash_vectors([entry["token_set"] for entry in entries]))
+                index_path.parent.mkdir(parents=True, exist_ok=True)
+                # Write then rename, so a concurrent run never reads a half-written index.
+                partial_path = index_path.with_name(f"{index_path.name}.{os.getpid()}.tmp")
+                faiss.write_index(vector_index, str(partial_path))
+                os.replace(partial_path, index_path)
+                _prune_faiss_index_cache(index_path.parent)
+            # Serialized bytes (not the SWIG object) so the payload survives the IO manager between ops.
+            index_payload["faiss_index"] = faiss.serialize_index(vector_index)
+            metrics["index_type"] = "faiss_hnsw"
+            metrics["index_path"] = str(index_path)
+
     context.log.info(f"Index metrics: {metrics}")
-    return {"entries": entries, "metrics": metrics}
+    return index_payload
+
+
+@lru_cache(maxsize=None)
+def _load_faiss():
+    # Optional: faiss-cpu backs RAG_INDEX_BACKEND=faiss; callers fall back to the lexical index without it.
+    try:
+        import faiss
+    except ImportError:
+        return None
+    return faiss
+
+
+def _faiss_index_path(entries: List[Dict[str, Any]]) -> Path:
+    # Stable across runs: keyed by the index parameters and the ordered chunk ids and texts,
+    # which fully determine the hashed vectors.
+    cache_dir = Path(os.getenv("RAG_INDEX_CACHE", "/tmp/rag_index_cache"))
+    corpus_hash = hashlib.sha256(f"hnsw{_HNSW_NEIGHBORS}:{_HASH_DIM}".encode("utf-8"))
+    for entry in entries:
+        corpus_hash.update(f"\0{entry['chunk_id']}\0{entry['text']}".encode("utf-8"))
+    return cache_dir / f"faiss_hnsw_{corpus_hash.hexdigest()}.index"
+
+
+def _prune_faiss_index_cache(cache_dir: Path) -> None:
+    # Every corpus change writes a new index; keep only the most recently built ones.
+    keep = max(1, int(os.getenv("RAG_INDEX_CACHE_KEEP", "3")))
+    cached = sorted(cache_dir.glob("faiss_hnsw_*.index"), key=lambda path: path.stat().st_mtime_ns, reverse=True)
+    for stale_path in cached[keep:]:
+        stale_path.unlink(missing_ok=True)
+
+
+def _hash_vectors(token_sets: List[frozenset]):
+    # Feature hashing with crc32 (stable across processes, unlike hash()) into L2-normalized rows,
+    # so inner-product search ranks by cosine similarity.
+    import numpy as np
+
+    vectors = np.zeros((len(token_sets), _HASH_DIM), dtype=np.float32)
+    for row, tokens in enumerate(token_sets):
+        for token in tokens:
+            vectors[row, zlib.crc32(token.encode("utf-8")) % _HASH_DIM] = 1.0
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def _load_vector_index(index_payload: Dict[str, Any]):
+    # Rebuild the FAISS index once per op; None means the payload uses the lexical index.
+    if "faiss_index" not in index_payload:
+        return None
+    return _load_faiss().deserialize_index(index_payload["faiss_index"])
+
+
+def _score_entries(index_payload: Dict[str, Any], query_tokens: frozenset):
+    # Count overlaps through the postings of the query tokens only; no set union is ever built because
+    # |query ∪ entry| = |query| + |entry| - overlap comes from the stored set sizes.
+    import numpy as np
+
+    entry_sizes = index_payload["entry_sizes"]
+    # One dict probe per query token (get) instead of a membership test followed by a lookup.
+    matched = [positions for positions in map(index_payload["postings"].get, query_tokens) if positions is not None]
+    if matched:
+        # Each entry appears at most once per token's postings, so bincount gives the overlap directly.
+        overlaps = np.bincount(np.concatenate(matched), minlength=len(entry_sizes))
+    else:
+        overlaps = np.zeros(len(entry_sizes), dtype=np.int64)
+    query_size = len(query_tokens)
+    return overlaps / np.maximum(query_size + entry_sizes - overlaps, 1)
+
+
+def _top_k_positions(scores, top_k: int) -> List[int]:
+    # Partition down to the candidates that can reach the top k, then order only those.
+    # Ranking uses the rounded score and a stable sort, so ties keep index order like before.
+    import numpy as np
+
+    rounded = np.round(scores, 4)
+    if top_k <= 0 or not len(rounded):
+        return []
+    if top_k < len(rounded):
+        kth_best = np.partition(rounded, -top_k)[-top_k]
+        candidates = np.flatnonzero(rounded >= kth_best)
+    else:
+        candidates = np.arange(len(rounded))
+    ranked = candidates[np.argsort(-rounded[candidates], kind="stable")]
+    return ranked[:top_k].tolist()
+
+
+def _rank_entries(index_payload: Dict[str, Any], vector_index, query: str, top_k: int) -> List[Tuple[int, float]]:
+    # Return (entry position, rounded score) pairs for the best top_k entries, best first.
+    query_tokens = frozenset(_tokenize(query))
+    if vector_index is not None:
+        result_count = min(top_k, len(index_payload["entries"]))
+        if result_count <= 0:
+            return []
+        similarities, positions = vector_index.search(_hash_vectors([query_tokens]), result_count)
+        return [
+            (int(position), round(float(similarity), 4))
+            for position, similarity in zip(positions[0], similarities[0])
+            if position >= 0
+        ]
+
+    scores = _score_entries(index_payload, query_tokens)
+    return [(position, round(float(scores[position]), 4)) for position in _top_k_positions(scores, top_k)]
 
 
 @op
@@ -174,33 +414,27 @@ def build_query(context) -> str:
 
 @op
 def retrieve_relevant_chunks(context, index_payload: Dict[str, Any], query: str, top_k: int = 3) -> Dict[str, Any]:
-    """Retrieve top-k chunks by lexical overlap score."""
-    query_tokens = set(_tokenize(query))
-    scored: List[Dict[str, Any]] = []
-
-    # Score by token overlap (Jaccard-like) to emulate ranking behavior.
-    for entry in index_payload["entries"]:
-        entry_tokens = set(entry["tokens"])
-        overlap = len(query_tokens.intersection(entry_tokens))
-        union = len(query_tokens.union(entry_tokens)) or 1
-        score = overlap / union
-        scored.append(
-            {
-                "chunk_id": entry["chunk_id"],
-                "doc_id": entry["doc_id"],
-                "title": entry["title"],
-                "text": entry["text"],
-                "score": round(score, 4),
-            }
-        )
+    """Retrieve top-k chunks by lexical overlap score (or cosine similarity with the FAISS backend)."""
+    entries = index_payload["entries"]
 
-    scored.sort(key=lambda item: item["score"], reverse=True)
-    retrieved = scored[:top_k]
+    # Score by token overlap (Jaccard-like) to emulate ranking behavior; only the top-k become records.
+    ranked = _rank_entries(index_payload, _load_vector_index(index_payload), query, top_k)
+    retrieved: List[Dict[str, Any]] = [
+        {
+            "chunk_id": entries[position]["chunk_id"],
+            "doc_id": entries[position]["doc_id"],
+            "title": entries[position]["title"],
+            "text": entries[position]["text"],
+            "display_snippet": entries[position]["display_snippets"]["grounded"],
+            "score": score,
+        }
+        for position, score in ranked
+    ]
     metrics = {
         "top_k": top_k,
         "retrieved_count": len(retrieved),
         "best_score": retrieved[0]["score"] if retrieved else 0,
-        "timestamp": datetime.utcnow().isoformat(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
     }
     context.log.info(f"Retrieval metrics: {metrics}")
     return {"query": query, "retrieved": retrieved, "metrics": metrics}
@@ -220,7 +454,7 @@ def generate_baseline_answer(context, query: str) -> Dict[str, Any]:
         "answer": answer,
         "citations": [],
         "mode": "without_rag",
-        "timestamp": datetime.utcnow().isoformat(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
     }
 
 
@@ -229,16 +463,11 @@ def generate_grounded_answer(context, retrieval_payload: Dict[str, Any]) -> Dict
     """Generate a context-grounded answer from retrieved chunks."""
     query = retrieval_payload["query"]
     retrieved = retrieval_payload["retrieved"]
-    bullet_points = []
-
-    # Build answer snippets directly from retrieved chunks as explicit grounding.
-    for item in retrieved:
-        snippet = item["text"][:140]
-        bullet_points.append(f"- [{item['chunk_id']}] {snippet}...")
 
+    # Answer snippets come straight from retrieved chunks as explicit grounding.
     answer = (
         f"Using retrieved context for query: {query}\n"
-        + "\n".join(bullet_points)
+        + "\n".join(item["display_snippet"] for item in retrieved)
         + "\n\nThis response is grounded in retrieved chunks from the indexed corpus."
     )
 
@@ -249,7 +478,7 @@ def generate_grounded_answer(context, retrieval_payload: Dict[str, Any]) -> Dict
         "answer": answer,
         "citations": citations,
         "mode": "with_rag",
-        "timestamp": datetime.utcnow().isoformat(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
     }
 
 
@@ -263,7 +492,7 @@ def evaluate_baseline_answer(context, baseline_answer: Dict[str, Any]) -> Dict[s
         "answer_token_count": len(answer_tokens),
         "citation_count": len(baseline_answer["citations"]),
         "grounding_score": 0.0,
-        "timestamp": datetime.utcnow().isoformat(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
     }
     context.log.info(f"Baseline metrics: {metrics}")
     return metrics
@@ -284,7 +513,7 @@ def evaluate_grounded_answer(context, grounded_answer: Dict[str, Any], retrieval
         "retrieved_count": retrieved_count,
         "citation_count": len(citations),
         "grounding_score": round(grounding_score, 2),
-        "timestamp": datetime.utcnow().isoformat(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
     }
     context.log.info(f"Grounded metrics: {metrics}")
     return metrics
@@ -306,7 +535,6 @@ def persist_baseline_artifacts(context, baseline_answer: Dict[str, Any], baselin
 @op
 def persist_rag_artifacts(
     context,
-    chunk_payload: Dict[str, Any],
     index_payload: Dict[str, Any],
     retrieval_payload: Dict[str, Any],
     grounded_answer: Dict[str, Any],
@@ -315,8 +543,8 @@ def persist_rag_artifacts(
     """Persist RAG run artifacts as JSON files."""
     # Persist end-to-end evidence of what was indexed, retrieved, and generated.
     payload = {
-        "chunk_metrics": chunk_payload["metrics"],
-        "index_metrics": index_payload["metrics"],
+        "chunk_metrics": index_payload["chunk_metrics"],
+        "index_metrics": index_payload["index_metrics"],
         "retrieval": retrieval_payload,
         "answer": grounded_answer,
         "metrics": grounded_metrics,
@@ -343,28 +571,22 @@ def build_query_batch(context) -> List[str]:
 def run_session_with_rag(context, index_payload: Dict[str, Any], queries: List[str], top_k: int = 2) -> Dict[str, Any]:
     """Run a multi-query session and produce aggregate metrics."""
     entries = index_payload["entries"]
-    session_results = []
-
-    # Process each query independently to surface per-query retrieval behavior.
-    for query in queries:
-        query_tokens = set(_tokenize(query))
-        scored = []
-        for entry in entries:
-            entry_tokens = set(entry["tokens"])
-            overlap = len(query_tokens.intersection(entry_tokens))
-            union = len(query_tokens.union(entry_tokens)) or 1
-            scored.append({**entry, "score": round(overlap / union, 4)})
-        scored.sort(key=lambda item: item["score"], reverse=True)
-        retrieved = scored[:top_k]
-        answer = "\n".join([f"- [{item['chunk_id']}] {item['text'][:100]}..." for item in retrieved])
-        session_results.append(
-            {
-                "query": query,
-                "retrieved_count": len(retrieved),
-                "best_score": retrieved[0]["score"] if retrieved else 0,
-                "answer": answer,
-            }
-        )
+    vector_index = _load_vector_index(index_payload)
+
+    def answer_query(query: str) -> Dict[str, Any]:
+        ranked = _rank_entries(index_payload, vector_index, query, top_k)
+        answer = "\n".join(entries[position]["display_snippets"]["session"] for position, _ in ranked)
+        return {
+            "query": query,
+            "retrieved_count": len(ranked),
+            "best_score": ranked[0][1] if ranked else 0,
+            "answer": answer,
+        }
+
+    # Queries are independent and only read the index, so they run concurrently; map() keeps input order.
+    max_workers = max(1, min(int(os.getenv("RAG_SESSION_WORKERS", "4")), len(queries)))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        session_results = list(executor.map(answer_query, queries))
 
     # Aggregate metrics provide a compact quality snapshot for the whole batch.
     aggregate = {
@@ -373,7 +595,7 @@ def run_session_with_rag(context, index_payload: Dict[str, Any], queries: List[s
             sum(item["best_score"] for item in session_results) / max(1, len(session_results)),
             4,
         ),
-        "timestamp": datetime.utcnow().isoformat(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
     }
     context.log.info(f"Session aggregate metrics: {aggregate}")
     return {"results": session_results, "aggregate": aggregate}
@@ -398,19 +620,17 @@ def chat_without_rag_job():
     persist_baseline_artifacts(baseline_answer, baseline_metrics)
 
 
-@job
+@job(executor_def=RAG_EXECUTOR)
 def chat_with_rag_job():
-    """RAG path: ingest -> chunk -> index -> retrieve -> grounded answer -> metrics -> artifacts."""
+    """RAG path: ingest -> chunk + index -> retrieve -> grounded answer -> metrics -> artifacts."""
     # This job is the DE-focused RAG orchestration baseline.
     documents = ingest_documents()
-    chunk_payload = chunk_documents(documents)
-    index_payload = build_mock_index(chunk_payload)
+    index_payload = chunk_and_index(documents)
     query = build_query()
     retrieval_payload = retrieve_relevant_chunks(index_payload, query)
     grounded_answer = generate_grounded_answer(retrieval_payload)
     grounded_metrics = evaluate_grounded_answer(grounded_answer, retrieval_payload)
     persist_rag_artifacts(
-        chunk_payload,
         index_payload,
         retrieval_payload,
         grounded_answer,
@@ -418,13 +638,12 @@ def chat_with_rag_job():
     )
 
 
-@job
+@job(executor_def=RAG_EXECUTOR)
 def interactive_chat_session_job():
     """Batch RAG simulation for multiple queries with aggregate metrics."""
     # This job is useful for periodic QA/regression style checks.
     documents = ingest_documents()
-    chunk_payload = chunk_documents(documents)
-    index_payload = build_mock_index(chunk_payload)
+    index_payload = chunk_and_index(documents)
     queries = build_query_batch()
     session_payload = run_session_with_rag(index_payload, queries)
     persist_session_artifacts(session_payload)
@@ -1,10 +1,17 @@
 """Google Cloud Platform resource configuration for Dagster."""
 
 import os
-from google.cloud import storage, bigquery
+import threading
+from typing import Any, Dict, Tuple
+
 from dagster import resource, Field, String
 
 
+# Clients hold gRPC/HTTP channels and auth state, so runs in this process share them per configuration.
+_GCP_CLIENTS: Dict[Tuple[str, str], Dict[str, Any]] = {}
+_GCP_CLIENTS_LOCK = threading.Lock()
+
+
 @resource(
     config_schema={
         "project_id": Field(String, default_value=os.getenv("GCP_PROJECT_ID", "")),
@@ -14,8 +21,16 @@ from dagster import resource, Field, String
 def gcp_resource(context):
     """Resource that provides GCP clients (Storage and BigQuery)."""
     config = context.resource_config
-    
-    return {
-        "storage_client": storage.Client(project=config["project_id"]),
-        "bigquery_client": bigquery.Client(project=config["project_id"]),
-    }
+    key = (config["project_id"], config["credentials_path"])
+    with _GCP_CLIENTS_LOCK:
+        clients = _GCP_CLIENTS.get(key)
+        if clients is None:
+            # Imported here so loading the code location doesn't pull in the google-cloud/gRPC stack.
+            from google.cloud import storage, bigquery
+
+            clients = {
+                "storage_client": storage.Client(project=config["project_id"]),
+                "bigquery_client": bigquery.Client(project=config["project_id"]),
+            }
+            _GCP_CLIENTS[key] = clients
+    return clients
@@ -1,10 +1,19 @@
 """PostgreSQL resource configuration for Dagster."""
 
 import os
+import threading
+from typing import Dict, Tuple
+
 from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
 from dagster import resource, Field, String, Int
 
 
+# Engines (and their connection pools) are shared by every run in this process that uses the same settings.
+_ENGINES: Dict[Tuple, Engine] = {}
+_ENGINES_LOCK = threading.Lock()
+
+
 @resource(
     config_schema={
         "host": Field(String, default_value=os.getenv("POSTGRES_HOST", "localhost")),
@@ -17,9 +26,21 @@ from dagster import resource, Field, String, Int
 def postgres_resource(context):
     """Resource that provides a SQLAlchemy engine for PostgreSQL."""
     config = context.resource_config
-    connection_string = (
-        f"postgresql://{config['user']}:{config['password']}@"
-        f"{config['host']}:{config['port']}/{config['database']}"
-    )
-    engine = create_engine(connection_string)
+    key = (config['user'], config['password'], config['host'], config['port'], config['database'])
+    with _ENGINES_LOCK:
+        engine = _ENGINES.get(key)
+        if engine is None:
+            connection_string = (
+                f"postgresql+psycopg2://{config['user']}:{config['password']}@"
+                f"{config['host']}:{config['port']}/{config['database']}"
+            )
+            # pool_recycle drops connections before server/proxy idle timeouts can turn them stale.
+            engine = create_engine(
+                connection_string,
+                pool_pre_ping=True,
+                pool_size=5,
+                max_overflow=10,
+                pool_recycle=1800,
+            )
+            _ENGINES[key] = engine
     return engine
@@ -1,32 +1,56 @@
 """Tests for Dagster jobs and ops."""
 
+import hashlib
 import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from types import SimpleNamespace
 
 import pandas as pd
 import pytest
 from dagster import Failure, build_op_context
 from sqlalchemy import text
 
-from dags.dag_01_hello_world import goodbye_message, generate_output, hello_message
+from dags.dag_01_hello_world import goodbye_message, generate_output, hello_message, sleep_task
 from dags.dag_02_python_tasks import collect_stats
-from dags.dag_03_data_pipeline import extract_data, validate_data
+from dags.dag_03_data_pipeline import data_pipeline_job, etl_core, extract_data
+from dags import dag_04_postgres_taxi
 from dags.dag_04_postgres_taxi import (
     _build_postgres_engine,
-    add_unique_id_and_filename,
+    _compute_unique_row_ids,
+    _download_file,
     cleanup_files,
     create_taxi_tables,
     load_csv_to_staging,
     merge_data_to_main_table,
 )
 from dags.dag_06_chat_pipeline import (
-    build_mock_index,
-    chunk_documents,
+    _tokenize,
+    chunk_and_index,
     evaluate_grounded_answer,
     generate_grounded_answer,
+    ingest_documents,
     persist_rag_artifacts,
     retrieve_relevant_chunks,
+    run_session_with_rag,
 )
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _load_artifact(artifact_path):
+    """Parse a persisted JSON artifact, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.loads(Path(artifact_path).read_bytes())
+    with open(artifact_path, "r", encoding="utf-8") as artifact_file:
+        return json.load(artifact_file)
+
 
 def test_hello_message():
     """Test the hello message op."""
@@ -43,6 +67,13 @@ def test_generate_output():
     assert "value" in result
 
 
+def test_sleep_task_defaults_to_no_delay():
+    """Test the sleep op passes its input through without sleeping by default."""
+    context = build_op_context()
+    payload = {"value": "x", "greeting": "Hello, Will!"}
+    assert sleep_task(context, payload) == payload
+
+
 def test_goodbye_message():
     """Test the goodbye message op."""
     context = build_op_context()
@@ -64,7 +95,10 @@ def test_collect_stats_success(monkeypatch):
                 "last_updated": "2026-01-01T00:00:00Z",
             }
 
-    monkeypatch.setattr("dags.dag_02_python_tasks.requests.get", lambda _url: MockResponse())
+    monkeypatch.setattr(
+        "dags.dag_02_python_tasks._get_session",
+        lambda: SimpleNamespace(get=lambda _url, timeout: MockResponse()),
+    )
 
     context = build_op_context()
     result = collect_stats(context)
@@ -78,10 +112,10 @@ def test_collect_stats_success(monkeypatch):
 def test_collect_stats_failure(monkeypatch):
     """Test GitHub stats op raises Dagster Failure on request errors."""
 
-    def _raise_error(_url):
+    def _raise_error(_url, timeout):
         raise RuntimeError("network unavailable")
 
-    monkeypatch.setattr("dags.dag_02_python_tasks.requests.get", _raise_error)
+    monkeypatch.setattr("dags.dag_02_python_tasks._get_session", lambda: SimpleNamespace(get=_raise_error))
 
     context = build_op_context()
     with pytest.raises(Failure):
@@ -97,8 +131,8 @@ def test_extract_data():
     assert "columns" in result
 
 
-def test_validate_data_success():
-    """Test data validation with valid data."""
+def test_etl_core_success():
+    """Test validation and transformation with valid data."""
     context = build_op_context()
     
     data = {
@@ -107,13 +141,14 @@ def test_validate_data_success():
         'source': 'test'
     }
     
-    result = validate_data(context, data)
-    assert result['quality_score'] == 0.99
-    assert result['valid_rows'] > 0
+    result = etl_core(context, data)
+    assert result['validation']['quality_score'] == 0.99
+    assert result['validation']['valid_rows'] > 0
+    assert result['processed_rows'] == result['validation']['valid_rows']
 
 
-def test_validate_data_failure():
-    """Test data validation with invalid data."""
+def test_etl_core_empty_input():
+    """Test validation and transformation with empty data."""
     context = build_op_context()
     
     data = {
@@ -122,11 +157,18 @@ def test_validate_data_failure():
         'source': 'test'
     }
     
-    result = validate_data(context, data)
+    result = etl_core(context, data)
     assert isinstance(result, dict)
-    assert result['valid_rows'] == 0
-    assert result['invalid_rows'] == 0
-    assert result['quality_score'] == 0.99
+    assert result['validation']['valid_rows'] == 0
+    assert result['validation']['invalid_rows'] == 0
+    assert result['validation']['quality_score'] == 0.99
+
+
+def test_data_pipeline_job_runs_in_process():
+    """Test the ETL job end to end with the in-memory IO manager."""
+    result = data_pipeline_job.execute_in_process()
+    assert result.success
+    assert result.output_for_node("load_data")["rows_loaded"] == 990
 
 
 def test_rag_chunk_retrieve_and_evaluate_flow():
@@ -141,11 +183,11 @@ def test_rag_chunk_retrieve_and_evaluate_flow():
         }
     ]
 
-    chunk_payload = chunk_documents(context, documents)
-    assert chunk_payload["metrics"]["document_count"] == 1
-    assert chunk_payload["metrics"]["chunk_count"] >= 1
+    index_payload = chunk_and_index(context, documents)
+    assert index_payload["chunk_metrics"]["document_count"] == 1
+    assert index_payload["chunk_metrics"]["chunk_count"] >= 1
+    assert index_payload["index_metrics"]["indexed_chunks"] == index_payload["chunk_metrics"]["chunk_count"]
 
-    index_payload = build_mock_index(context, chunk_payload)
     retrieval_payload = retrieve_relevant_chunks(context, index_payload, "What improved in Kestra 1.1?")
     assert retrieval_payload["metrics"]["retrieved_count"] >= 1
 
@@ -158,10 +200,184 @@ def test_rag_chunk_retrieve_and_evaluate_flow():
     assert grounded_metrics["citation_count"] == len(grounded_answer["citations"])
 
 
-def test_taxi_postgres_integration_lite(tmp_path):
-    """Integration-lite test: create tables, load tiny CSV, enrich IDs, and merge to main table."""
+def test_tokenize_matches_regex_definition():
+    """Test both tokenizer paths (ASCII translate, non-ASCII regex) keep the [a-zA-Z0-9_]+ token contract."""
+    ascii_text = "Kestra 1.1: UI/UX, secret_management & Kubernetes\tretries\n(ok)"
+    non_ascii_text = "Kestra 1.1: UI/UX, \u201csecret_management\u201d & Kubernetes\u2014d\u00e9ploiement \u212a\u0130 ok"
+    for text in (ascii_text, non_ascii_text):
+        assert list(_tokenize(text)) == re.findall(r"[a-zA-Z0-9_]+", text.lower())
+
+
+def test_ingest_documents_reuses_cached_source_on_304(tmp_path, monkeypatch):
+    """Test the external source is revalidated with its ETag and reused when unchanged."""
+    monkeypatch.setenv("RAG_SOURCE_URL", "https://example.com/doc.txt")
+    monkeypatch.setenv("RAG_HTTP_CACHE", str(tmp_path))
+    sent_headers = []
+
+    def _get(_url, headers, timeout):
+        sent_headers.append(headers)
+        if headers.get("If-None-Match") == '"v1"':
+            return SimpleNamespace(status_code=304, headers={}, text="")
+        return SimpleNamespace(
+            status_code=200,
+            headers={"ETag": '"v1"'},
+            text="External RAG notes",
+            raise_for_status=lambda: None,
+        )
+
+    monkeypatch.setattr("dags.dag_06_chat_pipeline._get_http_session", lambda: SimpleNamespace(get=_get))
+
+    context = build_op_context()
+    first = ingest_documents(context)
+    second = ingest_documents(context)
+
+    assert first[-1]["content"] == second[-1]["content"] == "External RAG notes"
+    assert sent_headers == [{}, {"If-None-Match": '"v1"'}]
+
+
+def test_run_session_with_rag_keeps_query_order():
+    """Test concurrent session scoring returns one result per query in input order."""
+    context = build_op_context()
+    documents = [
+        {"id": "doc_1", "title": "Plugins", "source": "test", "content": "Kestra plugins and scheduling improvements."},
+        {"id": "doc_2", "title": "Lineage", "source": "test", "content": "Data lineage quality checks and retries."},
+    ]
+    index_payload = chunk_and_index(context, documents)
+    queries = ["Which plugins improved?", "How are retries handled?", "Anything about lineage?"]
+
+    session_payload = run_session_with_rag(context, index_payload, queries)
+    assert [item["query"] for item in session_payload["results"]] == queries
+    assert session_payload["aggregate"]["query_count"] == 3
+
+
+def test_rag_faiss_backend_retrieval(tmp_path, monkeypatch):
+    """Test the optional FAISS index backend returns ranked chunks and reuses the persisted index."""
+    pytest.importorskip("faiss")
+    monkeypatch.setenv("RAG_INDEX_BACKEND", "faiss")
+    monkeypatch.setenv("RAG_ARTIFACTS_DIR", str(tmp_path))
+    monkeypatch.setenv("RAG_INDEX_CACHE", str(tmp_path / "index_cache"))
+    context = build_op_context()
+    documents = [
+        {"id": "doc_1", "title": "Plugins", "source": "test", "content": "Kestra plugins and scheduling improvements."},
+        {"id": "doc_2", "title": "Lineage", "source": "test", "content": "Data lineage quality checks and retries."},
+    ]
+
+    index_payload = chunk_and_index(context, documents)
+    assert index_payload["index_metrics"]["index_type"] == "faiss_hnsw"
+    index_path = Path(index_payload["index_metrics"]["index_path"])
+    assert index_path.exists()
+
+    # A second run over the same corpus loads the persisted index instead of writing a new one.
+    index_mtime = index_path.stat().st_mtime_ns
+    rerun_payload = chunk_and_index(context, documents)
+    assert rerun_payload["index_metrics"]["index_path"] == str(index_path)
+    assert index_path.stat().st_mtime_ns == index_mtime
+    assert list((tmp_path / "index_cache").iterdir()) == [index_path]
+
+    retrieval_payload = retrieve_relevant_chunks(context, rerun_payload, "Which plugins improved?", 1)
+    assert retrieval_payload["retrieved"][0]["doc_id"] == "doc_1"
+
+
+def test_rag_faiss_index_cache_keeps_recent_indexes(tmp_path, monkeypatch):
+    """Test a changing corpus leaves at most RAG_INDEX_CACHE_KEEP indexes in the cache."""
+    pytest.importorskip("faiss")
+    monkeypatch.setenv("RAG_INDEX_BACKEND", "faiss")
+    monkeypatch.setenv("RAG_ARTIFACTS_DIR", str(tmp_path))
+    monkeypatch.setenv("RAG_INDEX_CACHE", str(tmp_path / "index_cache"))
+    monkeypatch.setenv("RAG_INDEX_CACHE_KEEP", "2")
     context = build_op_context()
 
+    index_paths = []
+    for revision in range(4):
+        documents = [{"id": "doc_1", "title": "Plugins", "source": "test", "content": f"Kestra plugins revision {revision}."}]
+        index_paths.append(chunk_and_index(context, documents)["index_metrics"]["index_path"])
+
+    assert sorted(str(path) for path in (tmp_path / "index_cache").iterdir()) == sorted(index_paths[-2:])
+
+
+# 8 MiB plus an odd tail, so every part count splits it into uneven ranges.
+DOWNLOAD_BODY = bytes(range(256)) * (8 * 4096) + b"tail-bytes"
+
+
+class _RangeHandler(BaseHTTPRequestHandler):
+    """Serves DOWNLOAD_BODY with Range support at /file, a redirect to it, a range-ignoring copy and a stall."""
+
+    range_requests = []
+
+    def do_GET(self):
+        if self.path == "/redirect":
+            self.send_response(302)
+            self.send_header("Location", "/file")
+            self.end_headers()
+            return
+        if self.path == "/stall":
+            time.sleep(2)
+        range_header = self.headers.get("Range")
+        if self.path == "/file" and range_header:
+            start, end = (int(bound) for bound in range_header.split("=", 1)[1].split("-"))
+            end = min(end, len(DOWNLOAD_BODY) - 1)
+            self.range_requests.append((start, end))
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(DOWNLOAD_BODY)}")
+            self.send_header("Content-Length", str(end - start + 1))
+            self.end_headers()
+            self.wfile.write(DOWNLOAD_BODY[start : end + 1])
+            return
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(DOWNLOAD_BODY)))
+        self.end_headers()
+        self.wfile.write(DOWNLOAD_BODY)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def range_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _RangeHandler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    _RangeHandler.range_requests = []
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.parametrize("parts", [8, 3, 1])
+def test_download_file_follows_redirect_and_splits_ranges(tmp_path, range_server, parts):
+    """Test the ranged download reassembles the file exactly for each part count."""
+    destination = tmp_path / "download.csv.gz"
+
+    parts_used = _download_file(f"{range_server}/redirect", str(destination), parts)
+
+    assert parts_used == parts
+    assert destination.read_bytes() == DOWNLOAD_BODY
+    # The one-byte probe plus one request per part; a single stream sends no further range request.
+    assert len(_RangeHandler.range_requests) == 1 + (parts if parts > 1 else 0)
+
+
+def test_download_file_falls_back_when_ranges_are_ignored(tmp_path, range_server):
+    """Test a server answering 200 to the range probe is streamed as a single download."""
+    destination = tmp_path / "download.csv.gz"
+
+    assert _download_file(f"{range_server}/norange", str(destination), 8) == 1
+    assert destination.read_bytes() == DOWNLOAD_BODY
+
+
+def test_download_file_times_out_on_stalled_server(tmp_path, range_server, monkeypatch):
+    """Test a stalled server fails the download instead of hanging it."""
+    monkeypatch.setattr(dag_04_postgres_taxi, "DOWNLOAD_TIMEOUT", 0.2)
+
+    with pytest.raises(OSError):
+        _download_file(f"{range_server}/stall", str(tmp_path / "download.csv.gz"), 8)
+
+
+def test_taxi_postgres_integration_lite(tmp_path):
+    """Integration-lite test: create tables, load tiny CSV with IDs, and merge to main table."""
+    engine = _build_postgres_engine()
+    context = build_op_context(resources={"postgres_engine": engine})
+
     sample_rows = [
         {
             "VendorID": "1",
@@ -208,15 +424,13 @@ def test_taxi_postgres_integration_lite(tmp_path):
     csv_path = tmp_path / "yellow_tripdata_test.csv"
     pd.DataFrame(sample_rows).to_csv(csv_path, index=False)
 
-    table_info = create_taxi_tables(context, "yellow")
+    table_info = create_taxi_tables(context, "yellow", "2019", "01")
     rows_loaded = load_csv_to_staging(context, str(csv_path), table_info)
     assert rows_loaded == 2
 
-    merge_info = add_unique_id_and_filename(context, rows_loaded, table_info, str(csv_path))
-    merge_result = merge_data_to_main_table(context, merge_info)
+    merge_result = merge_data_to_main_table(context, rows_loaded, table_info)
     assert merge_result["status"] == "success"
 
-    engine = _build_postgres_engine()
     with engine.connect() as connection:
         staged_count = connection.execute(text("SELECT COUNT(*) FROM public.yellow_tripdata_staging")).scalar()
         staged_tagged_count = connection.execute(
@@ -239,6 +453,110 @@ def test_taxi_postgres_integration_lite(tmp_path):
     assert not csv_path.exists()
 
 
+def test_month_partition_name_ignores_month_formatting():
+    """Test '3' and '03' resolve to the same zero-padded month partition instead of overlapping ones."""
+    engine = _build_postgres_engine()
+    context = build_op_context(resources={"postgres_engine": engine})
+
+    create_taxi_tables(context, "yellow", "2019", "3")
+    create_taxi_tables(context, "yellow", "2019", "03")
+
+    with engine.connect() as connection:
+        partitions = connection.execute(
+            text(
+                "SELECT inhrelid::regclass::text FROM pg_inherits "
+                "WHERE inhparent = 'public.yellow_tripdata'::regclass "
+                "AND inhrelid::regclass::text LIKE 'yellow_tripdata_2019_%3'"
+            )
+        ).scalars().all()
+    assert partitions == ["yellow_tripdata_2019_03"]
+
+
+def test_unique_row_ids_match_sql_md5_expression():
+    """Client-side row IDs must equal md5 of the text-cast concatenation Postgres used to compute."""
+    chunk_df = pd.DataFrame(
+        {
+            "vendorid": ["1", ""],
+            "tpep_pickup_datetime": ["2019-01-01 00:00:00", "2019-01-01 01:00:00"],
+            "tpep_dropoff_datetime": ["2019-01-01 00:10:00", "2019-01-01 01:20:00"],
+            "pulocationid": ["100", "101"],
+            "dolocationid": ["200", "201"],
+            "fare_amount": ["10.50", "16"],
+            "trip_distance": ["1.2", ""],
+        }
+    )
+
+    row_ids = _compute_unique_row_ids(chunk_df, "yellow")
+
+    assert row_ids == [
+        hashlib.md5(b"12019-01-01 00:00:002019-01-01 00:10:0010020010.51.2").hexdigest(),
+        hashlib.md5(b"2019-01-01 01:00:002019-01-01 01:20:0010120116").hexdigest(),
+    ]
+
+
+def test_legacy_float_ids_are_migrated_to_raw_csv_row_ids():
+    """Rows staged as '1.0' by the former pandas loader get the ID a raw-text re-ingest computes."""
+    engine = _build_postgres_engine()
+    context = build_op_context(resources={"postgres_engine": engine})
+    table_info = create_taxi_tables(context, "yellow", "2019", "01")
+
+    raw_rows = pd.DataFrame(
+        {
+            "vendorid": ["1", "2"],
+            "tpep_pickup_datetime": ["2019-01-07 00:00:00", "2019-01-07 01:00:00"],
+            "tpep_dropoff_datetime": ["2019-01-07 00:10:00", "2019-01-07 01:20:00"],
+            "pulocationid": ["100", "101"],
+            "dolocationid": ["200", "201"],
+            "fare_amount": ["10.5", "16"],
+            "trip_distance": ["1.2", "3.4"],
+        }
+    )
+    new_ids = _compute_unique_row_ids(raw_rows, "yellow")
+    legacy_rows = raw_rows.assign(vendorid=["1.0", "2.0"])
+    legacy_ids = _compute_unique_row_ids(legacy_rows, "yellow")
+
+    insert_sql = text(
+        "INSERT INTO public.yellow_tripdata (unique_row_id, vendorid, tpep_pickup_datetime, "
+        "tpep_dropoff_datetime, pulocationid, dolocationid, fare_amount, trip_distance) "
+        "VALUES (:unique_row_id, :vendorid, :pickup, :dropoff, :pulocationid, :dolocationid, :fare, :distance)"
+    )
+
+    def _params(frame, row_ids):
+        return [
+            {
+                "unique_row_id": row_id,
+                "vendorid": row["vendorid"],
+                "pickup": row["tpep_pickup_datetime"],
+                "dropoff": row["tpep_dropoff_datetime"],
+                "pulocationid": row["pulocationid"],
+                "dolocationid": row["dolocationid"],
+                "fare": float(row["fare_amount"]),
+                "distance": float(row["trip_distance"]),
+            }
+            for row_id, (_, row) in zip(row_ids, frame.iterrows())
+        ]
+
+    with engine.begin() as connection:
+        connection.execute(text("DELETE FROM public.yellow_tripdata WHERE unique_row_id = ANY(:ids)"), {"ids": new_ids + legacy_ids})
+        # Both trips were loaded by the old loader; the first was also re-ingested with its raw-text ID.
+        connection.execute(insert_sql, _params(legacy_rows, legacy_ids) + _params(raw_rows.iloc[:1], new_ids[:1]))
+        connection.execute(text("COMMENT ON TABLE public.yellow_tripdata IS NULL"))
+
+    try:
+        create_taxi_tables(context, "yellow", "2019", "01")
+        with engine.connect() as connection:
+            stored = connection.execute(
+                text("SELECT unique_row_id, vendorid FROM public.yellow_tripdata WHERE unique_row_id = ANY(:ids)"),
+                {"ids": new_ids + legacy_ids},
+            ).all()
+    finally:
+        with engine.begin() as connection:
+            connection.execute(text("DELETE FROM public.yellow_tripdata WHERE unique_row_id = ANY(:ids)"), {"ids": new_ids + legacy_ids})
+
+    assert table_info["main_table"] == "public.yellow_tripdata"
+    assert sorted(stored) == sorted(zip(new_ids, ["1", "2"]))
+
+
 def test_rag_artifact_contract(tmp_path, monkeypatch):
     """Contract test: persisted RAG artifact must include expected top-level sections."""
     monkeypatch.setenv("RAG_ARTIFACTS_DIR", str(tmp_path))
@@ -253,24 +571,20 @@ def test_rag_artifact_contract(tmp_path, monkeypatch):
         }
     ]
 
-    chunk_payload = chunk_documents(context, documents)
-    index_payload = build_mock_index(context, chunk_payload)
+    index_payload = chunk_and_index(context, documents)
     retrieval_payload = retrieve_relevant_chunks(context, index_payload, "What are RAG steps?")
     grounded_answer = generate_grounded_answer(context, retrieval_payload)
     grounded_metrics = evaluate_grounded_answer(context, grounded_answer, retrieval_payload)
 
     result = persist_rag_artifacts(
         context,
-        chunk_payload,
         index_payload,
         retrieval_payload,
         grounded_answer,
         grounded_metrics,
     )
 
-    artifact_path = result["artifact_path"]
-    with open(artifact_path, "r", encoding="utf-8") as artifact_file:
-        payload = json.load(artifact_file)
+    payload = _load_artifact(result["artifact_path"])
 
     assert set(payload.keys()) == {"chunk_metrics", "index_metrics", "retrieval", "answer", "metrics"}
     assert payload["retrieval"]["query"]